@@ -2,32 +2,78 @@
 Configuration file for API keys and settings
 """
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 
-load_dotenv()
-# LLM Provider API Keys
-GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
 
-# Model Names
-GROQ_MODEL = "llama-3.3-70b-versatile"
-OPENAI_MODEL = "gpt-4o-mini"
-GOOGLE_MODEL = "gemini-1.5-flash"
+@dataclass(frozen=True)
+class Config:
+    """Immutable snapshot of application settings"""
 
-# RAG Configuration
-CHUNK_SIZE = 1000
-CHUNK_OVERLAP = 200
-TOP_K_RESULTS = 3
+    # LLM Provider API Keys
+    GROQ_API_KEY: str = ""
+    OPENAI_API_KEY: str = ""
+    GOOGLE_API_KEY: str = ""
 
-# Response Mode Settings
-CONCISE_MAX_TOKENS = 150
-DETAILED_MAX_TOKENS = 500
+    # Model Names
+    GROQ_MODEL: str = "llama-3.3-70b-versatile"
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    GOOGLE_MODEL: str = "gemini-1.5-flash"
 
-# Vector Store Settings
-VECTOR_STORE_PATH = "data/vector_store"
-EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    # RAG Configuration
+    CHUNK_SIZE: int = 1000
+    CHUNK_OVERLAP: int = 200
+    TOP_K_RESULTS: int = 3
+    RETRIEVAL_CACHE_SIZE: int = 256
+    # Most passages (sentences or list blocks) kept from each retrieved chunk in the prompt
+    CONTEXT_MAX_PASSAGES: int = 4
 
-# Web Search Settings
-MAX_SEARCH_RESULTS = 3
+    # Response Mode Settings
+    CONCISE_MAX_TOKENS: int = 150
+    DETAILED_MAX_TOKENS: int = 500
+    # Token budget for chat history resent to the LLM each turn
+    MAX_HISTORY_TOKENS: int = 3000
 
+    # Vector Store Settings
+    VECTOR_STORE_PATH: str = "data/vector_store"
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_GPU_BATCH_SIZE: int = 128
+    # "auto" picks CUDA when available; set e.g. "cpu" to force a device
+    EMBEDDING_DEVICE: str = "auto"
+    # "onnx" serves an int8-quantized ONNX export of the model; "torch" uses FP32 PyTorch
+    EMBEDDING_BACKEND: str = "onnx"
+    # Empty picks the int8 export for this CPU (arm64, AVX-512 VNNI, AVX-512 or AVX2)
+    EMBEDDING_ONNX_FILE: str = ""
+    HNSW_M: int = 32
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64
+    # Corpora up to this many chunks are searched with a NumPy matrix instead of FAISS
+    SMALL_INDEX_THRESHOLD: int = 1000
+
+    # Web Search Settings
+    MAX_SEARCH_RESULTS: int = 3
+    SEARCH_CACHE_SIZE: int = 256
+    SEARCH_CACHE_TTL: int = 600  # seconds
+    SEARCH_TIMEOUT: int = 5  # seconds per request
+    SEARCH_RETRY_ATTEMPTS: int = 2
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """
+    Load the .env file once and return the configuration snapshot
+
+    Returns:
+        Config: Cached, immutable configuration
+    """
+    load_dotenv()
+    return Config(
+        GROQ_API_KEY=os.environ.get("GROQ_API_KEY", ""),
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", ""),
+        GOOGLE_API_KEY=os.environ.get("GOOGLE_API_KEY", ""),
+        EMBEDDING_DEVICE=os.environ.get("EMBEDDING_DEVICE", Config.EMBEDDING_DEVICE),
+        EMBEDDING_BACKEND=os.environ.get("EMBEDDING_BACKEND", Config.EMBEDDING_BACKEND),
+        EMBEDDING_ONNX_FILE=os.environ.get("EMBEDDING_ONNX_FILE", Config.EMBEDDING_ONNX_FILE),
+    )
@@ -4,39 +4,61 @@ A chatbot with RAG, web search, and multiple response modes
 """
 import streamlit as st
 import os
-import sys
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from dotenv import load_dotenv
-
-load_dotenv()
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
 from models.llm import get_available_models
 from utils.rag import RAGSystem
 from utils.web_search import search_and_format
 from utils.document_loader import process_uploaded_file
-from Config.config import CONCISE_MAX_TOKENS, DETAILED_MAX_TOKENS
+from Config.config import get_config
 
+cfg = get_config()
 
-def initialize_rag_system():
-    """Initialize the RAG system with medical documents"""
-    if 'rag_system' not in st.session_state:
-        with st.spinner("Initializing knowledge base..."):
-            rag_system = RAGSystem()
-            
-            # Try to load existing vector store
-            if not rag_system.load_vector_store():
-                # If no saved vector store, initialize from documents
-                docs_path = os.path.join(os.path.dirname(__file__), "data/medical_docs")
-                if os.path.exists(docs_path):
-                    rag_system.initialize_from_directory(docs_path)
-                    rag_system.save_vector_store()
-            
-            st.session_state.rag_system = rag_system
 
+@st.cache_resource(show_spinner="Initializing knowledge base...")
+def get_rag_system():
+    """Initialize the RAG system with medical documents, shared across all sessions"""
+    rag_system = RAGSystem()
+    
+    # Try to load existing vector store
+    if not rag_system.load_vector_store():
+        # If no saved vector store, initialize from documents
+        docs_path = os.path.join(os.path.dirname(__file__), "data/medical_docs")
+        if os.path.exists(docs_path):
+            rag_system.initialize_from_directory(docs_path)
+            rag_system.save_vector_store()
+    
+    return rag_system
 
-def get_chat_response(chat_model, messages, system_prompt, use_rag=True, use_web_search=False, response_mode="detailed"):
+
+@lru_cache(maxsize=8)
+def _build_system_prompt(system_prompt, response_mode):
     """
-    Get response from the chat model with RAG and web search support
+    Compose the system prompt with its response mode instruction
+    
+    The result is byte-identical for a given (system_prompt, response_mode), so it
+    forms a stable prefix that provider-side prompt caching can reuse across turns.
+    
+    Args:
+        system_prompt: User-defined system prompt
+        response_mode: "concise" or "detailed"
+        
+    Returns:
+        str: System prompt followed by the mode instruction
+    """
+    if response_mode == "concise":
+        mode_instruction = f"\n\nIMPORTANT: Provide a CONCISE response (maximum {cfg.CONCISE_MAX_TOKENS} words). Be brief and to the point."
+    else:
+        mode_instruction = f"\n\nIMPORTANT: Provide a DETAILED response (maximum {cfg.DETAILED_MAX_TOKENS} words). Include comprehensive explanations and context."
+    
+    return system_prompt + mode_instruction
+
+
+def get_chat_response_stream(chat_model, messages, system_prompt, use_rag=True, use_web_search=False, response_mode="detailed"):
+    """
+    Stream the response from the chat model with RAG and web search support
     
     Args:
         chat_model: The LLM model to use
@@ -45,56 +67,71 @@ def get_chat_response(chat_model, messages, system_prompt, use_rag=True, use_web
         use_rag: Whether to use RAG for context
         use_web_search: Whether to use web search
         response_mode: "concise" or "detailed"
+        
+    Yields:
+        str: Response text chunks as they are generated
     """
     try:
         # Get the last user message
         last_message = messages[-1]["content"] if messages else ""
         
+        # Gather RAG and web search context concurrently; neither depends on the other
+        rag_system = get_rag_system() if use_rag else None
+        use_rag = rag_system is not None and rag_system.is_initialized
+        retrieved_docs, search_results = [], ""
+        if use_rag or use_web_search:
+            with st.spinner("Gathering context..."):
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    f_rag = executor.submit(rag_system.retrieve_context, last_message) if use_rag else None
+                    f_web = executor.submit(search_and_format, last_message) if use_web_search else None
+                    retrieved_docs = f_rag.result() if f_rag else []
+                    search_results = f_web.result() if f_web else ""
+        
         # Build context from RAG
         context = ""
-        if use_rag and 'rag_system' in st.session_state:
-            rag_system = st.session_state.rag_system
-            if rag_system.is_initialized:
-                retrieved_docs = rag_system.retrieve_context(last_message)
-                if retrieved_docs:
-                    context += "\n\n=== Knowledge Base Context ===\n"
-                    context += rag_system.format_context(retrieved_docs)
+        if retrieved_docs:
+            context += "\n\n=== Knowledge Base Context ===\n"
+            context += rag_system.format_context(retrieved_docs, last_message)
         
         # Add web search results if enabled
-        if use_web_search:
-            with st.spinner("Searching the web..."):
-                search_results = search_and_format(last_message)
-                if search_results and "No search results found" not in search_results:
-                    context += "\n\n=== Web Search Results ===\n"
-                    context += search_results
+        if search_results and not search_results.startswith(("No search results found", "Error searching the web")):
+            context += "\n\n=== Web Search Results ===\n"
+            context += search_results
         
-        # Adjust system prompt based on response mode
-        mode_instruction = ""
-        if response_mode == "concise":
-            mode_instruction = f"\n\nIMPORTANT: Provide a CONCISE response (maximum {CONCISE_MAX_TOKENS} words). Be brief and to the point."
-        else:
-            mode_instruction = f"\n\nIMPORTANT: Provide a DETAILED response (maximum {DETAILED_MAX_TOKENS} words). Include comprehensive explanations and context."
-        
-        # Prepare messages for the model
-        enhanced_system_prompt = system_prompt + mode_instruction
+        # Prepare messages for the model; per-turn context goes after the stable prefix
+        enhanced_system_prompt = _build_system_prompt(system_prompt, response_mode)
         if context:
             enhanced_system_prompt += f"\n\nUse the following context to answer the user's question:\n{context}"
         
-        formatted_messages = [SystemMessage(content=enhanced_system_prompt)]
-        
         # Add conversation history
+        history = []
         for msg in messages:
             if msg["role"] == "user":
-                formatted_messages.append(HumanMessage(content=msg["content"]))
+                history.append(HumanMessage(content=msg["content"]))
             else:
-                formatted_messages.append(AIMessage(content=msg["content"]))
+                history.append(AIMessage(content=msg["content"]))
+        
+        # Keep only the most recent turns that fit the history token budget
+        trimmed_history = trim_messages(
+            history,
+            max_tokens=cfg.MAX_HISTORY_TOKENS,
+            token_counter=count_tokens_approximately,
+            strategy="last",
+            start_on="human",
+            include_system=False
+        )
+        if not trimmed_history and history:
+            trimmed_history = history[-1:]
+        
+        formatted_messages = [SystemMessage(content=enhanced_system_prompt)] + trimmed_history
         
-        # Get response from model
-        response = chat_model.invoke(formatted_messages)
-        return response.content
+        # Stream response from model
+        for chunk in chat_model.stream(formatted_messages):
+            if chunk.content:
+                yield chunk.content
     
     except Exception as e:
-        return f"Error getting response: {str(e)}"
+        yield f"Error getting response: {str(e)}"
 
 
 def instructions_page():
@@ -209,7 +246,7 @@ def chat_page():
     st.title("🤖 Healthcare Assistant Chat")
     
     # Initialize RAG system
-    initialize_rag_system()
+    get_rag_system()
     
     # Sidebar configuration
     with st.sidebar:
@@ -263,9 +300,15 @@ def chat_page():
                 try:
                     with st.spinner("Processing document..."):
                         chunks = process_uploaded_file(uploaded_file)
-                        st.session_state.rag_system.add_documents(chunks)
-                        st.session_state.rag_system.save_vector_store()
-                        st.success(f"✅ Added {len(chunks)} chunks to knowledge base!")
+                        rag_system = get_rag_system()
+                        added = rag_system.add_documents(chunks)
+                    if added is None:
+                        st.error("Error adding document to the knowledge base.")
+                    elif added == 0:
+                        st.info("ℹ️ This document is already in the knowledge base.")
+                    else:
+                        rag_system.save_vector_store()
+                        st.success(f"✅ Added {added} new chunks to knowledge base!")
                 except Exception as e:
                     st.error(f"Error processing document: {str(e)}")
     
@@ -296,16 +339,14 @@ def chat_page():
         
         # Generate and display bot response
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = get_chat_response(
-                    chat_model, 
-                    st.session_state.messages, 
-                    system_prompt,
-                    use_rag=use_rag,
-                    use_web_search=use_web_search,
-                    response_mode=response_mode
-                )
-                st.markdown(response)
+            response = st.write_stream(get_chat_response_stream(
+                chat_model, 
+                st.session_state.messages, 
+                system_prompt,
+                use_rag=use_rag,
+                use_web_search=use_web_search,
+                response_mode=response_mode
+            ))
         
         # Add bot response to chat history
         st.session_state.messages.append({"role": "assistant", "content": response})
@@ -1,28 +1,163 @@
 """
 Embedding models for RAG implementation
 """
-import os
-import sys
+import platform
+import streamlit as st
+import torch
 from langchain_huggingface import HuggingFaceEmbeddings
+from Config.config import get_config
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from Config.config import EMBEDDING_MODEL
+cfg = get_config()
 
 
-def get_embedding_model():
+def _resolve_device():
     """
-    Initialize and return the HuggingFace embedding model
+    Pick the device for the embedding model
+    
+    Returns:
+        str: EMBEDDING_DEVICE if set explicitly, otherwise "cuda" when available, else "cpu"
+    """
+    if cfg.EMBEDDING_DEVICE != "auto":
+        return cfg.EMBEDDING_DEVICE
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _cpu_flags():
+    """
+    Read the CPU feature flags reported by the kernel
+    
+    Returns:
+        set: Flag names such as "avx2" or "avx512_vnni"; empty where /proc/cpuinfo is unavailable
+    """
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def _resolve_onnx_file():
+    """
+    Pick the quantized ONNX export that matches this machine
+    
+    Returns:
+        str: EMBEDDING_ONNX_FILE if set, otherwise the arm64, AVX-512 (VNNI) or
+            AVX2 int8 export, falling back to the unquantized model elsewhere
+    """
+    if cfg.EMBEDDING_ONNX_FILE:
+        return cfg.EMBEDDING_ONNX_FILE
+    
+    machine = platform.machine().lower()
+    if machine in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    if machine not in ("x86_64", "amd64"):
+        return "onnx/model.onnx"
+    
+    # AVX2 is the safe x86 baseline, including where flags can't be read (macOS, Windows)
+    flags = _cpu_flags()
+    if "avx512_vnni" in flags:
+        return "onnx/model_qint8_avx512_vnni.onnx"
+    if "avx512f" in flags:
+        return "onnx/model_qint8_avx512.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+
+def _build_embeddings():
+    """
+    Load the HuggingFace embedding model from disk (uncached)
+    
+    On CUDA the PyTorch model runs in FP16 with larger batches. On CPU with the
+    "onnx" backend the int8-quantized ONNX export for this CPU shipped in the model
+    repository is run through ONNX Runtime; if that fails (e.g. optimum or
+    onnxruntime is not installed) the FP32 PyTorch model is used instead.
     
     Returns:
         HuggingFaceEmbeddings: Initialized embedding model
     """
+    device = _resolve_device()
+    on_gpu = device.startswith("cuda")
+    encode_kwargs = {
+        'normalize_embeddings': True,
+        'batch_size': cfg.EMBEDDING_GPU_BATCH_SIZE if on_gpu else cfg.EMBEDDING_BATCH_SIZE
+    }
+    
+    if cfg.EMBEDDING_BACKEND == "onnx" and device == "cpu":
+        try:
+            return HuggingFaceEmbeddings(
+                model_name=cfg.EMBEDDING_MODEL,
+                model_kwargs={
+                    'device': 'cpu',
+                    'backend': 'onnx',
+                    'model_kwargs': {
+                        'file_name': _resolve_onnx_file(),
+                        'provider': 'CPUExecutionProvider'
+                    }
+                },
+                encode_kwargs=encode_kwargs
+            )
+        except Exception as e:
+            print(f"ONNX embedding backend unavailable, falling back to PyTorch: {str(e)}")
+    
     try:
         embeddings = HuggingFaceEmbeddings(
-            model_name=EMBEDDING_MODEL,
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
+            model_name=cfg.EMBEDDING_MODEL,
+            model_kwargs={
+                'device': device,
+                'model_kwargs': {'torch_dtype': torch.float16 if on_gpu else torch.float32}
+            },
+            encode_kwargs=encode_kwargs
         )
         return embeddings
     except Exception as e:
         raise RuntimeError(f"Failed to initialize embedding model: {str(e)}")
 
+
+def describe_embeddings(embeddings):
+    """
+    Identify the model and backend that produce an embedding model's vectors
+    
+    Vectors from different models, or from the int8 ONNX and FP32 PyTorch
+    backends, are not interchangeable, so stored indexes record this.
+    
+    Args:
+        embeddings (HuggingFaceEmbeddings): Embedding model
+        
+    Returns:
+        dict: Model name, backend and ONNX file (empty for PyTorch)
+    """
+    model_kwargs = embeddings.model_kwargs or {}
+    return {
+        'model': embeddings.model_name,
+        'backend': model_kwargs.get('backend', 'torch'),
+        'file_name': model_kwargs.get('model_kwargs', {}).get('file_name', '')
+    }
+
+
+@st.cache_resource(show_spinner=False)
+def _get_cached_embeddings():
+    """
+    Load the embedding model once per Streamlit process and share it across sessions
+    
+    Returns:
+        HuggingFaceEmbeddings: Shared embedding model
+    """
+    return _build_embeddings()
+
+
+def get_embedding_model():
+    """
+    Initialize and return the HuggingFace embedding model
+    
+    Inside a running Streamlit app the model is cached with st.cache_resource so
+    reruns and new sessions reuse it; outside Streamlit (e.g. CLI ingestion) a
+    fresh model is built.
+    
+    Returns:
+        HuggingFaceEmbeddings: Initialized embedding model
+    """
+    if st.runtime.exists():
+        return _get_cached_embeddings()
+    return _build_embeddings()
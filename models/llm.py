@@ -1,20 +1,16 @@
 """
 LLM model implementations for multiple providers
 """
-import os
-import sys
+from functools import lru_cache
 from langchain_groq import ChatGroq
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
+from Config.config import get_config
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from Config.config import (
-    GROQ_API_KEY, GROQ_MODEL,
-    OPENAI_API_KEY, OPENAI_MODEL,
-    GOOGLE_API_KEY, GOOGLE_MODEL
-)
+cfg = get_config()
 
 
+@lru_cache(maxsize=4)
 def get_chatgroq_model(temperature=0.7):
     """
     Initialize and return the Groq chat model
@@ -25,13 +21,13 @@ def get_chatgroq_model(temperature=0.7):
     Returns:
         ChatGroq: Initialized Groq chat model
     """
+    if not cfg.GROQ_API_KEY:
+        raise ValueError("GROQ_API_KEY is not set")
+    
     try:
-        if not GROQ_API_KEY:
-            raise ValueError("GROQ_API_KEY is not set")
-        
         groq_model = ChatGroq(
-            api_key=GROQ_API_KEY,
-            model=GROQ_MODEL,
+            api_key=cfg.GROQ_API_KEY,
+            model=cfg.GROQ_MODEL,
             temperature=temperature
         )
         return groq_model
@@ -39,6 +35,7 @@ def get_chatgroq_model(temperature=0.7):
         raise RuntimeError(f"Failed to initialize Groq model: {str(e)}")
 
 
+@lru_cache(maxsize=4)
 def get_openai_model(temperature=0.7):
     """
     Initialize and return the OpenAI chat model
@@ -49,13 +46,13 @@ def get_openai_model(temperature=0.7):
     Returns:
         ChatOpenAI: Initialized OpenAI chat model
     """
+    if not cfg.OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY is not set")
+    
     try:
-        if not OPENAI_API_KEY:
-            raise ValueError("OPENAI_API_KEY is not set")
-        
         openai_model = ChatOpenAI(
-            api_key=OPENAI_API_KEY,
-            model=OPENAI_MODEL,
+            api_key=cfg.OPENAI_API_KEY,
+            model=cfg.OPENAI_MODEL,
             temperature=temperature
         )
         return openai_model
@@ -63,6 +60,7 @@ def get_openai_model(temperature=0.7):
         raise RuntimeError(f"Failed to initialize OpenAI model: {str(e)}")
 
 
+@lru_cache(maxsize=4)
 def get_google_model(temperature=0.7):
     """
     Initialize and return the Google Gemini chat model
@@ -73,13 +71,13 @@ def get_google_model(temperature=0.7):
     Returns:
         ChatGoogleGenerativeAI: Initialized Google chat model
     """
+    if not cfg.GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY is not set")
+    
     try:
-        if not GOOGLE_API_KEY:
-            raise ValueError("GOOGLE_API_KEY is not set")
-        
         google_model = ChatGoogleGenerativeAI(
-            google_api_key=GOOGLE_API_KEY,
-            model=GOOGLE_MODEL,
+            google_api_key=cfg.GOOGLE_API_KEY,
+            model=cfg.GOOGLE_MODEL,
             temperature=temperature
         )
         return google_model
@@ -87,20 +85,24 @@ def get_google_model(temperature=0.7):
         raise RuntimeError(f"Failed to initialize Google model: {str(e)}")
 
 
+@lru_cache(maxsize=1)
 def get_available_models():
     """
     Check which LLM providers are available based on API keys
     
+    The result is cached for the lifetime of the process since the API keys
+    are read once at import; treat the returned dict as read-only.
+    
     Returns:
         dict: Dictionary of available providers and their models
     """
     available = {}
     
-    if GROQ_API_KEY:
+    if cfg.GROQ_API_KEY:
         available["Groq"] = get_chatgroq_model
-    if OPENAI_API_KEY:
+    if cfg.OPENAI_API_KEY:
         available["OpenAI"] = get_openai_model
-    if GOOGLE_API_KEY:
+    if cfg.GOOGLE_API_KEY:
         available["Google Gemini"] = get_google_model
     
     return available
@@ -1,25 +1,48 @@
 """
 Document loading and processing utilities
 """
+import glob
+import io
 import os
-import sys
+from concurrent.futures import ProcessPoolExecutor
 from typing import List
+from pypdf import PdfReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import (
     TextLoader,
-    PyPDFLoader,
-    DirectoryLoader
+    PyPDFLoader
 )
 from langchain.schema import Document
+from Config.config import get_config
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from Config.config import CHUNK_SIZE, CHUNK_OVERLAP
+cfg = get_config()
+
+# Shared splitter; it holds no per-call state so one instance serves every caller
+_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=cfg.CHUNK_SIZE,
+    chunk_overlap=cfg.CHUNK_OVERLAP,
+    length_function=len,
+    separators=["\n\n", "\n", " ", ""]
+)
+
+
+def _load_txt(path: str) -> List[Document]:
+    """Load a single text file (module-level so it can be sent to worker processes)"""
+    return TextLoader(path).load()
+
+
+def _load_one_pdf(path: str) -> List[Document]:
+    """Load a single PDF file (module-level so it can be sent to worker processes)"""
+    return PyPDFLoader(path).load()
 
 
 def load_documents_from_directory(directory_path: str) -> List[Document]:
     """
     Load all documents from a directory
     
+    Files are parsed in parallel across worker processes since each load is
+    independent and CPU-bound.
+    
     Args:
         directory_path (str): Path to the directory containing documents
         
@@ -29,21 +52,23 @@ def load_documents_from_directory(directory_path: str) -> List[Document]:
     try:
         documents = []
         
-        # Load text files
         if os.path.exists(directory_path):
-            txt_loader = DirectoryLoader(
-                directory_path,
-                glob="**/*.txt",
-                loader_cls=TextLoader
+            # Text files (recursive) and PDF files (top level)
+            txt_paths = sorted(glob.glob(os.path.join(directory_path, "**", "*.txt"), recursive=True))
+            pdf_paths = sorted(
+                os.path.join(directory_path, f) for f in os.listdir(directory_path) if f.endswith('.pdf')
             )
-            documents.extend(txt_loader.load())
+            jobs = [(_load_txt, path) for path in txt_paths] + [(_load_one_pdf, path) for path in pdf_paths]
             
-            # Load PDF files
-            pdf_files = [f for f in os.listdir(directory_path) if f.endswith('.pdf')]
-            for pdf_file in pdf_files:
-                pdf_path = os.path.join(directory_path, pdf_file)
-                pdf_loader = PyPDFLoader(pdf_path)
-                documents.extend(pdf_loader.load())
+            if len(jobs) == 1:
+                loader, path = jobs[0]
+                documents.extend(loader(path))
+            elif jobs:
+                max_workers = min(os.cpu_count() or 1, len(jobs))
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    futures = [executor.submit(loader, path) for loader, path in jobs]
+                    for future in futures:
+                        documents.extend(future.result())
         
         return documents
     except Exception as e:
@@ -60,19 +85,45 @@ def load_document_from_file(file_path: str) -> List[Document]:
     Returns:
         List[Document]: List containing the loaded document
     """
+    if file_path.endswith('.pdf'):
+        loader = PyPDFLoader(file_path)
+    elif file_path.endswith('.txt'):
+        loader = TextLoader(file_path)
+    else:
+        raise ValueError(f"Unsupported file type: {file_path}")
+    
     try:
-        if file_path.endswith('.pdf'):
-            loader = PyPDFLoader(file_path)
-        elif file_path.endswith('.txt'):
-            loader = TextLoader(file_path)
-        else:
-            raise ValueError(f"Unsupported file type: {file_path}")
-        
         return loader.load()
     except Exception as e:
         raise RuntimeError(f"Failed to load document from {file_path}: {str(e)}")
 
 
+def load_document_from_bytes(name: str, data: bytes) -> List[Document]:
+    """
+    Load a document from in-memory file contents
+    
+    Args:
+        name (str): Original file name, used for type detection and metadata
+        data (bytes): Raw file contents
+        
+    Returns:
+        List[Document]: One document per PDF page, or a single text document
+    """
+    if name.endswith('.txt'):
+        return [Document(page_content=data.decode("utf-8", errors="replace"), metadata={"source": name})]
+    if not name.endswith('.pdf'):
+        raise ValueError(f"Unsupported file type: {name}")
+    
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        return [
+            Document(page_content=page.extract_text(), metadata={"source": name, "page": i})
+            for i, page in enumerate(reader.pages)
+        ]
+    except Exception as e:
+        raise RuntimeError(f"Failed to load document from {name}: {str(e)}")
+
+
 def split_documents(documents: List[Document]) -> List[Document]:
     """
     Split documents into chunks for embedding
@@ -83,18 +134,7 @@ def split_documents(documents: List[Document]) -> List[Document]:
     Returns:
         List[Document]: List of document chunks
     """
-    try:
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        
-        chunks = text_splitter.split_documents(documents)
-        return chunks
-    except Exception as e:
-        raise RuntimeError(f"Failed to split documents: {str(e)}")
+    return _SPLITTER.split_documents(documents)
 
 
 def process_uploaded_file(uploaded_file) -> List[Document]:
@@ -107,20 +147,7 @@ def process_uploaded_file(uploaded_file) -> List[Document]:
     Returns:
         List[Document]: List of processed document chunks
     """
-    try:
-        # Save uploaded file temporarily
-        temp_path = f"/tmp/{uploaded_file.name}"
-        with open(temp_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        
-        # Load and process the document
-        documents = load_document_from_file(temp_path)
-        chunks = split_documents(documents)
-        
-        # Clean up temporary file
-        os.remove(temp_path)
-        
-        return chunks
-    except Exception as e:
-        raise RuntimeError(f"Failed to process uploaded file: {str(e)}")
+    # Load and process the document straight from memory
+    documents = load_document_from_bytes(uploaded_file.name, uploaded_file.getvalue())
+    return split_documents(documents)
 
@@ -1,16 +1,141 @@
 """
 Retrieval-Augmented Generation (RAG) implementation
 """
+import hashlib
+import json
+import math
 import os
-import sys
-from typing import List, Optional
+import pickle
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain.schema import Document
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from Config.config import TOP_K_RESULTS, VECTOR_STORE_PATH
-from models.embeddings import get_embedding_model
+from Config.config import get_config
+from models.embeddings import describe_embeddings, get_embedding_model
 from utils.document_loader import load_documents_from_directory, split_documents
+from utils.small_index import SmallIndex
+
+cfg = get_config()
+
+# Content hashes of indexed chunks, persisted next to the FAISS files
+CHUNK_HASHES_FILE = "chunk_hashes.pkl"
+# Metric and embedding model a saved store was built with
+STORE_META_FILE = "store_meta.json"
+
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_SENTENCE_END = re.compile(r"[.!?]\s*$", re.M)
+_LIST_ITEM = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+", re.M)
+_WORD = re.compile(r"[a-z0-9]+")
+# Words are compared by prefix so "treated"/"treatment" and "prevent"/"prevention" match
+_STEM_LENGTH = 5
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "can", "do", "does", "for", "how", "i", "in", "is",
+    "it", "me", "my", "of", "on", "or", "should", "the", "to", "what", "when",
+    "which", "who", "why", "with", "you", "your"
+})
+
+
+def _stem(word: str) -> str:
+    """Reduce a lowercase word to a crude stem (singular, fixed-length prefix)"""
+    if len(word) > 3 and word.endswith("s"):
+        word = word[:-1]
+    return word[:_STEM_LENGTH]
+
+
+def _stems(text: str) -> set:
+    """Return the stems of all words in a text"""
+    return {_stem(w) for w in _WORD.findall(text.lower())}
+
+
+def _query_terms(query: str) -> set:
+    """Return the stems of the content words of a query"""
+    return {_stem(w) for w in _WORD.findall(query.lower()) if w not in _STOPWORDS}
+
+
+def _split_passages(text: str) -> List[str]:
+    """
+    Split chunk text into sentences, keeping list blocks and headings attached
+    
+    Args:
+        text (str): Chunk text
+        
+    Returns:
+        List[str]: Passages in document order
+    """
+    passages = []
+    heading = ""
+    for paragraph in _PARAGRAPH_SPLIT.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        
+        is_list = bool(_LIST_ITEM.search(paragraph))
+        if not is_list and not _SENTENCE_END.search(paragraph):
+            # A bare title or heading; carry it into the next passage
+            heading = f"{heading}\n{paragraph}" if heading else paragraph
+            continue
+        
+        if is_list:
+            units = [paragraph]
+        else:
+            units = [s for s in _SENTENCE_SPLIT.split(" ".join(paragraph.split("\n"))) if s]
+        if heading:
+            units[0] = f"{heading}\n{units[0]}"
+            heading = ""
+        passages.extend(units)
+    
+    if heading:
+        passages.append(heading)
+    return passages
+
+
+def _select_passages(text: str, terms: set, max_passages: int) -> str:
+    """
+    Keep the passages of a chunk that best match the query terms
+    
+    A passage must contain at least half of the query terms to be kept; terms
+    found in most passages of the chunk (such as the condition's name) count
+    for less when ranking. If no passage qualifies the whole chunk is returned.
+    
+    Args:
+        text (str): Chunk text
+        terms (set): Query term stems
+        max_passages (int): Maximum number of passages to keep
+        
+    Returns:
+        str: The selected passages in document order, or the full text
+    """
+    passages = _split_passages(text)
+    if len(passages) <= max_passages:
+        return text
+    
+    matches = [terms & _stems(p) for p in passages]
+    doc_freq = {t: sum(t in m for m in matches) for t in terms}
+    weight = {t: math.log(1 + len(passages) / n) for t, n in doc_freq.items() if n}
+    scores = [sum(weight[t] for t in m) for m in matches]
+    
+    min_overlap = max(1, math.ceil(len(terms) / 2))
+    ranked = sorted(
+        (i for i, m in enumerate(matches) if len(m) >= min_overlap),
+        key=lambda i: -scores[i]
+    )
+    if not ranked:
+        return text
+    return "\n".join(passages[i] for i in sorted(ranked[:max_passages]))
+
+
+def _chunk_hash(doc: Document) -> bytes:
+    """Return the SHA-256 digest of a chunk's text"""
+    return hashlib.sha256(doc.page_content.encode("utf-8")).digest()
 
 
 class RAGSystem:
@@ -21,6 +146,126 @@ class RAGSystem:
         self.embeddings = get_embedding_model()
         self.vector_store = None
         self.is_initialized = False
+        # Serializes writers when the instance is shared across sessions. Searches
+        # take no lock: writers never mutate the live store, they build an updated
+        # copy and swap the reference in.
+        self.lock = threading.Lock()
+        # LRU cache of (normalized query, k) -> retrieved documents
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Bumped on every invalidation so searches started earlier don't cache stale results
+        self._cache_generation = 0
+        # SHA-256 digests of every chunk already in the vector store
+        self._seen_hashes = set()
+        # Dense copy of the vectors used for search while the corpus is small
+        self._small_index = None
+    
+    def _refresh_small_index(self):
+        """Rebuild the NumPy search index, or drop it once the corpus outgrows the threshold"""
+        index = self.vector_store.index
+        if index.ntotal > cfg.SMALL_INDEX_THRESHOLD or index.metric_type != faiss.METRIC_INNER_PRODUCT:
+            self._small_index = None
+            return
+        
+        docstore = self.vector_store.docstore
+        id_map = self.vector_store.index_to_docstore_id
+        docs = [docstore.search(id_map[i]) for i in range(index.ntotal)]
+        self._small_index = SmallIndex(index.reconstruct_n(0, index.ntotal), docs)
+    
+    def _search_with_scores(self, query: str, k: int) -> List[tuple]:
+        """
+        Search the small NumPy index when present, otherwise FAISS
+        
+        Args:
+            query (str): User query
+            k (int): Number of documents to retrieve
+            
+        Returns:
+            List[tuple]: List of (document, score) tuples
+        """
+        small_index = self._small_index
+        if small_index is not None:
+            q = np.asarray(self.embeddings.embed_query(query), dtype="float32")
+            return small_index.search(q, k)
+        return self.vector_store.similarity_search_with_score(query, k=k)
+    
+    def _filter_new_chunks(self, chunks: List[Document], seen: set) -> Tuple[List[Document], set]:
+        """
+        Drop chunks whose text is already indexed (or repeated within the batch)
+        
+        Nothing is recorded here; callers add the returned hashes to
+        _seen_hashes only once the chunks are actually indexed.
+        
+        Args:
+            chunks (List[Document]): Candidate chunks
+            seen (set): Hashes of chunks already indexed
+            
+        Returns:
+            Tuple[List[Document], set]: Chunks not seen before and their hashes
+        """
+        new_chunks, new_hashes = [], set()
+        for chunk in chunks:
+            h = _chunk_hash(chunk)
+            if h not in seen and h not in new_hashes:
+                new_hashes.add(h)
+                new_chunks.append(chunk)
+        return new_chunks, new_hashes
+    
+    def _clear_cache(self):
+        """Drop cached retrieval results after the vector store changes"""
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_generation += 1
+    
+    def _copy_vector_store(self, store: FAISS) -> FAISS:
+        """
+        Return an independent copy of a vector store that can be modified safely
+        
+        Args:
+            store (FAISS): Live vector store that concurrent searches may be reading
+            
+        Returns:
+            FAISS: Copy with its own FAISS index, docstore and id mapping
+        """
+        id_map = dict(store.index_to_docstore_id)
+        docstore = InMemoryDocstore({doc_id: store.docstore.search(doc_id) for doc_id in id_map.values()})
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=faiss.clone_index(store.index),
+            docstore=docstore,
+            index_to_docstore_id=id_map,
+            distance_strategy=store.distance_strategy
+        )
+    
+    def _build_vector_store(self, chunks: List[Document]) -> FAISS:
+        """
+        Embed chunks in batches and index them in an HNSW graph
+        
+        Embeddings are unit-normalized, so inner product ranks exactly like
+        cosine similarity and is cheaper to compute than L2 distance.
+        
+        Args:
+            chunks (List[Document]): Document chunks to index
+            
+        Returns:
+            FAISS: Vector store backed by an inner-product IndexHNSWFlat
+        """
+        texts = [chunk.page_content for chunk in chunks]
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype="float32")
+        
+        index = faiss.IndexHNSWFlat(vectors.shape[1], cfg.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = cfg.HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = cfg.HNSW_EF_SEARCH
+        index.add(vectors)
+        
+        ids = [str(uuid.uuid4()) for _ in chunks]
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(dict(zip(ids, chunks))),
+            index_to_docstore_id=dict(enumerate(ids)),
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
     
     def initialize_from_directory(self, directory_path: str) -> bool:
         """
@@ -39,48 +284,65 @@ class RAGSystem:
             if not documents:
                 return False
             
-            # Split documents into chunks
-            chunks = split_documents(documents)
+            # Split documents into chunks, skipping duplicate text
+            chunks, hashes = self._filter_new_chunks(split_documents(documents), set())
             
             # Create vector store
-            self.vector_store = FAISS.from_documents(chunks, self.embeddings)
+            self.vector_store = self._build_vector_store(chunks)
+            self._seen_hashes = hashes
             self.is_initialized = True
+            self._refresh_small_index()
+            self._clear_cache()
             
             return True
         except Exception as e:
             print(f"Error initializing RAG system: {str(e)}")
             return False
     
-    def add_documents(self, documents: List[Document]) -> bool:
+    def add_documents(self, documents: List[Document]) -> Optional[int]:
         """
         Add new documents to the vector store
         
+        Chunks whose text is already indexed are skipped so re-uploads are not re-embedded.
+        
         Args:
             documents (List[Document]): List of documents to add
             
         Returns:
-            bool: True if documents were added successfully
+            Optional[int]: Number of new chunks added (0 if all were duplicates), or None on failure
         """
         try:
             chunks = split_documents(documents)
             
-            if self.vector_store is None:
-                # Create new vector store if it doesn't exist
-                self.vector_store = FAISS.from_documents(chunks, self.embeddings)
-                self.is_initialized = True
-            else:
-                # Add to existing vector store
-                self.vector_store.add_documents(chunks)
+            with self.lock:
+                chunks, hashes = self._filter_new_chunks(chunks, self._seen_hashes)
+                if not chunks:
+                    return 0
+                
+                if self.vector_store is None:
+                    # Create new vector store if it doesn't exist
+                    self.vector_store = self._build_vector_store(chunks)
+                    self.is_initialized = True
+                else:
+                    # Add to a copy so in-flight searches never see a half-updated index
+                    updated_store = self._copy_vector_store(self.vector_store)
+                    updated_store.add_documents(chunks)
+                    self.vector_store = updated_store
+                self._seen_hashes |= hashes
+                self._refresh_small_index()
+                self._clear_cache()
             
-            return True
+            return len(chunks)
         except Exception as e:
             print(f"Error adding documents: {str(e)}")
-            return False
+            return None
     
-    def retrieve_context(self, query: str, k: int = TOP_K_RESULTS) -> List[Document]:
+    def retrieve_context(self, query: str, k: int = cfg.TOP_K_RESULTS) -> List[Document]:
         """
         Retrieve relevant documents for a query
         
+        Results are cached per (normalized query, k) until the vector store changes.
+        
         Args:
             query (str): User query
             k (int): Number of documents to retrieve
@@ -88,18 +350,31 @@ class RAGSystem:
         Returns:
             List[Document]: List of relevant documents
         """
+        if not self.is_initialized or self.vector_store is None:
+            return []
+        
+        key = (query.strip().lower(), k)
+        with self._cache_lock:
+            generation = self._cache_generation
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return list(self._cache[key])
+        
+        # Perform similarity search; only the cache key is normalized
         try:
-            if not self.is_initialized or self.vector_store is None:
-                return []
-            
-            # Perform similarity search
-            results = self.vector_store.similarity_search(query, k=k)
-            return results
+            results = [doc for doc, _ in self._search_with_scores(query, k)]
         except Exception as e:
             print(f"Error retrieving context: {str(e)}")
             return []
+        
+        with self._cache_lock:
+            if generation == self._cache_generation:
+                self._cache[key] = results
+                if len(self._cache) > cfg.RETRIEVAL_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return list(results)
     
-    def retrieve_context_with_scores(self, query: str, k: int = TOP_K_RESULTS) -> List[tuple]:
+    def retrieve_context_with_scores(self, query: str, k: int = cfg.TOP_K_RESULTS) -> List[tuple]:
         """
         Retrieve relevant documents with similarity scores
         
@@ -110,18 +385,17 @@ class RAGSystem:
         Returns:
             List[tuple]: List of (document, score) tuples
         """
+        if not self.is_initialized or self.vector_store is None:
+            return []
+        
+        # Perform similarity search with scores
         try:
-            if not self.is_initialized or self.vector_store is None:
-                return []
-            
-            # Perform similarity search with scores
-            results = self.vector_store.similarity_search_with_score(query, k=k)
-            return results
+            return self._search_with_scores(query, k)
         except Exception as e:
             print(f"Error retrieving context with scores: {str(e)}")
             return []
     
-    def save_vector_store(self, path: str = VECTOR_STORE_PATH) -> bool:
+    def save_vector_store(self, path: str = cfg.VECTOR_STORE_PATH) -> bool:
         """
         Save the vector store to disk
         
@@ -131,47 +405,120 @@ class RAGSystem:
         Returns:
             bool: True if save was successful
         """
+        if self.vector_store is None:
+            return False
+        
         try:
-            if self.vector_store is None:
-                return False
-            
             os.makedirs(os.path.dirname(path), exist_ok=True)
-            self.vector_store.save_local(path)
+            with self.lock:
+                self.vector_store.save_local(path)
+                with open(os.path.join(path, CHUNK_HASHES_FILE), "wb") as f:
+                    pickle.dump(self._seen_hashes, f)
+                with open(os.path.join(path, STORE_META_FILE), "w") as f:
+                    json.dump(self._store_meta(), f)
             return True
         except Exception as e:
             print(f"Error saving vector store: {str(e)}")
             return False
     
-    def load_vector_store(self, path: str = VECTOR_STORE_PATH) -> bool:
+    def load_vector_store(self, path: str = cfg.VECTOR_STORE_PATH) -> bool:
         """
         Load the vector store from disk
         
+        A store built with another metric (e.g. the older flat L2 indexes) or a
+        different embedding model/backend is re-embedded from its own stored
+        chunks, so uploaded documents are kept, and saved back in place.
+        
         Args:
             path (str): Path to load the vector store from
             
         Returns:
             bool: True if load was successful
         """
-        try:
-            if os.path.exists(path):
-                self.vector_store = FAISS.load_local(
-                    path, 
-                    self.embeddings,
-                    allow_dangerous_deserialization=True
-                )
-                self.is_initialized = True
-                return True
+        if not os.path.exists(path):
             return False
+        
+        try:
+            self.vector_store = FAISS.load_local(
+                path, 
+                self.embeddings,
+                allow_dangerous_deserialization=True
+            )
+            self._seen_hashes = self._load_chunk_hashes(path)
+            
+            rebuild = self._needs_rebuild(path)
+            if rebuild:
+                print("Vector store was built with a different metric or embedding model; re-embedding it")
+                docstore = self.vector_store.docstore
+                docs = [docstore.search(doc_id) for doc_id in self.vector_store.index_to_docstore_id.values()]
+                self.vector_store = self._build_vector_store(docs)
         except Exception as e:
             print(f"Error loading vector store: {str(e)}")
             return False
+        
+        self.vector_store.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+        self.is_initialized = True
+        self._refresh_small_index()
+        self._clear_cache()
+        if rebuild:
+            self.save_vector_store(path)
+        return True
     
-    def format_context(self, documents: List[Document]) -> str:
+    def _store_meta(self) -> dict:
+        """Describe how vectors in this system's stores are produced and compared"""
+        return {"metric": "inner_product", "embeddings": describe_embeddings(self.embeddings)}
+    
+    def _needs_rebuild(self, path: str) -> bool:
+        """
+        Check whether a loaded store is incompatible with the current configuration
+        
+        Args:
+            path (str): Vector store directory
+            
+        Returns:
+            bool: True if the index is not inner-product or its embedding model differs
+        """
+        if self.vector_store.index.metric_type != faiss.METRIC_INNER_PRODUCT:
+            return True
+        
+        meta_path = os.path.join(path, STORE_META_FILE)
+        if not os.path.exists(meta_path):
+            return True
+        with open(meta_path) as f:
+            return json.load(f) != self._store_meta()
+    
+    def _load_chunk_hashes(self, path: str) -> set:
+        """
+        Load persisted chunk hashes, rebuilding them from the docstore if missing
+        
+        Args:
+            path (str): Vector store directory
+            
+        Returns:
+            set: SHA-256 digests of indexed chunks
+        """
+        hashes_path = os.path.join(path, CHUNK_HASHES_FILE)
+        if os.path.exists(hashes_path):
+            with open(hashes_path, "rb") as f:
+                return pickle.load(f)
+        
+        docstore = self.vector_store.docstore
+        return {
+            _chunk_hash(docstore.search(doc_id))
+            for doc_id in self.vector_store.index_to_docstore_id.values()
+        }
+    
+    def format_context(self, documents: List[Document], query: Optional[str] = None) -> str:
         """
         Format retrieved documents into a context string
         
+        When a query is given, each chunk is cut down to at most
+        CONTEXT_MAX_PASSAGES sentences or list blocks matching it, which keeps
+        irrelevant text out of the prompt.
+        
         Args:
             documents (List[Document]): List of retrieved documents
+            query (Optional[str]): User query used to pick the relevant sentences
             
         Returns:
             str: Formatted context string
@@ -179,9 +526,13 @@ class RAGSystem:
         if not documents:
             return ""
         
+        terms = _query_terms(query) if query else None
         context_parts = []
         for i, doc in enumerate(documents, 1):
-            context_parts.append(f"[Source {i}]\n{doc.page_content}")
+            content = doc.page_content
+            if terms:
+                content = _select_passages(content, terms, cfg.CONTEXT_MAX_PASSAGES)
+            context_parts.append(f"[Source {i}]\n{content}")
         
         return "\n\n".join(context_parts)
 
@@ -0,0 +1,50 @@
+"""
+Exact in-memory vector search for small corpora
+"""
+from typing import List, Tuple
+import numpy as np
+from langchain.schema import Document
+
+
+class SmallIndex:
+    """Brute-force inner-product search over a dense matrix of normalized embeddings"""
+
+    def __init__(self, vecs: np.ndarray, docs: List[Document]):
+        """
+        Initialize the index
+
+        Args:
+            vecs (np.ndarray): (N, dim) float32 matrix of unit-normalized embeddings
+            docs (List[Document]): Documents aligned with the rows of vecs
+        """
+        self.vecs = np.ascontiguousarray(vecs, dtype="float32")
+        self.docs = docs
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def search(self, q: np.ndarray, k: int) -> List[Tuple[Document, float]]:
+        """
+        Return the k documents with the highest inner product against a query
+
+        Args:
+            q (np.ndarray): (dim,) query embedding
+            k (int): Number of documents to return
+
+        Returns:
+            List[Tuple[Document, float]]: (document, score) pairs, best first
+        """
+        n = len(self.docs)
+        k = min(k, n)
+        if k <= 0:
+            return []
+
+        # Single GEMV, then an O(N) partition instead of a full sort
+        scores = self.vecs @ np.asarray(q, dtype="float32")
+        if k < n:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(-scores[top])]
+
+        return [(self.docs[i], float(scores[i])) for i in top]
@@ -1,33 +1,48 @@
 """
 Web search functionality for real-time information retrieval
 """
-import os
-import sys
+import threading
 from typing import List, Dict
+from cachetools import TTLCache
 from duckduckgo_search import DDGS
+from duckduckgo_search.exceptions import DuckDuckGoSearchException
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from Config.config import get_config
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from Config.config import MAX_SEARCH_RESULTS
+cfg = get_config()
 
+# One DDGS client reused across queries so its HTTP connections stay open
+_DDGS_SINGLETON = DDGS(timeout=cfg.SEARCH_TIMEOUT)
+_DDGS_LOCK = threading.Lock()
+# Formatted results per (query, max_results); separate lock so hits never wait on a search
+_CACHE = TTLCache(maxsize=cfg.SEARCH_CACHE_SIZE, ttl=cfg.SEARCH_CACHE_TTL)
+_CACHE_LOCK = threading.Lock()
 
-def search_web(query: str, max_results: int = MAX_SEARCH_RESULTS) -> List[Dict[str, str]]:
+
+@retry(
+    retry=retry_if_exception_type(DuckDuckGoSearchException),
+    stop=stop_after_attempt(cfg.SEARCH_RETRY_ATTEMPTS),
+    wait=wait_exponential(multiplier=0.2, max=1),
+    reraise=True
+)
+def search_web(query: str, max_results: int = cfg.MAX_SEARCH_RESULTS) -> List[Dict[str, str]]:
     """
     Perform a web search using DuckDuckGo
     
+    Transient failures such as rate limits are retried with exponential backoff.
+    
     Args:
         query (str): Search query
         max_results (int): Maximum number of results to return
         
     Returns:
         List[Dict[str, str]]: List of search results with title, body, and href
+        
+    Raises:
+        DuckDuckGoSearchException: If every attempt fails or is rate-limited
     """
-    try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=max_results))
-            return results
-    except Exception as e:
-        print(f"Error performing web search: {str(e)}")
-        return []
+    with _DDGS_LOCK:
+        return list(_DDGS_SINGLETON.text(query, max_results=max_results))
 
 
 def format_search_results(results: List[Dict[str, str]]) -> str:
@@ -59,10 +74,12 @@ def format_search_results(results: List[Dict[str, str]]) -> str:
     return "\n\n".join(formatted_parts)
 
 
-def search_and_format(query: str, max_results: int = MAX_SEARCH_RESULTS) -> str:
+def search_and_format(query: str, max_results: int = cfg.MAX_SEARCH_RESULTS) -> str:
     """
     Search the web and return formatted results
     
+    Successful results are cached for SEARCH_CACHE_TTL seconds per (query, max_results).
+    
     Args:
         query (str): Search query
         max_results (int): Maximum number of results to return
@@ -70,9 +87,21 @@ def search_and_format(query: str, max_results: int = MAX_SEARCH_RESULTS) -> str:
     Returns:
         str: Formatted search results
     """
+    key = (query, max_results)
+    with _CACHE_LOCK:
+        hit = _CACHE.get(key)
+    if hit is not None:
+        return hit
+    
     try:
         results = search_web(query, max_results)
-        return format_search_results(results)
-    except Exception as e:
+    except DuckDuckGoSearchException as e:
+        print(f"Error performing web search: {str(e)}")
         return f"Error searching the web: {str(e)}"
+    
+    formatted = format_search_results(results)
+    if results:
+        with _CACHE_LOCK:
+            _CACHE[key] = formatted
+    return formatted
 